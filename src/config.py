@@ -6,6 +6,7 @@ This module handles loading configuration from environment variables.
 
 import os
 import logging
+from functools import cached_property, lru_cache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,44 +18,51 @@ logger = logging.getLogger(__name__)
 class Config:
     """Configuration class for the Berlin Service Appointment Monitor."""
     
+    # The configuration banner is only logged for the first instance
+    _logged = False
+    
     def __init__(self):
         """Initialize configuration from environment variables."""
         
+        # Read every setting from a single snapshot of the environment
+        env = os.environ.copy()
+        
         # GitHub configuration
-        self.github_token = os.getenv('GITHUB_TOKEN')
-        self.github_repo = os.getenv('GITHUB_REPOSITORY', self._get_repo_from_context())
+        self.github_token = env.get('GITHUB_TOKEN')
+        self.github_repo = env.get('GITHUB_REPOSITORY', '')
         
         # Email notification configuration
-        self.notification_email = os.getenv('NOTIFICATION_EMAIL')
-        self.email_password = os.getenv('EMAIL_PASSWORD')
+        self.notification_email = env.get('NOTIFICATION_EMAIL')
+        self.email_password = env.get('EMAIL_PASSWORD')
         
         # Mobile push notification configuration
-        self.pushover_token = os.getenv('PUSHOVER_TOKEN')
-        self.pushover_user = os.getenv('PUSHOVER_USER')
-        self.pushbullet_token = os.getenv('PUSHBULLET_TOKEN')
-        self.ntfy_topic = os.getenv('NTFY_TOPIC')
+        self.pushover_token = env.get('PUSHOVER_TOKEN')
+        self.pushover_user = env.get('PUSHOVER_USER')
+        self.pushbullet_token = env.get('PUSHBULLET_TOKEN')
+        self.ntfy_topic = env.get('NTFY_TOPIC')
         
         # Webhook configuration (Discord, Slack, etc.)
-        self.webhook_url = os.getenv('WEBHOOK_URL')
+        self.webhook_url = env.get('WEBHOOK_URL')
         
         # Scraping configuration
-        self.check_interval = int(os.getenv('CHECK_INTERVAL', '300'))  # 5 minutes default
-        self.request_timeout = int(os.getenv('REQUEST_TIMEOUT', '30'))
+        self.check_interval = int(env.get('CHECK_INTERVAL', '300'))  # 5 minutes default
+        self.request_timeout = int(env.get('REQUEST_TIMEOUT', '30'))
+        
+        # Discovered location URLs are kept on disk and reused until they expire
+        self.locations_file = env.get('LOCATIONS_FILE', '.cache/locations.json')
+        self.locations_ttl = int(env.get('LOCATIONS_TTL', '86400'))  # 24 hours default
         
         # Logging configuration
-        self.log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+        self.log_level = env.get('LOG_LEVEL', 'INFO').upper()
+        
+        # Runtime context
+        self.running_in_actions = bool(env.get('GITHUB_ACTIONS'))
         
         self._validate_config()
-        self._log_config()
-    
-    def _get_repo_from_context(self) -> str:
-        """
-        Try to get repository name from GitHub Actions context.
-        
-        Returns:
-            Repository name in format 'owner/repo' or empty string
-        """
-        return os.getenv('GITHUB_REPOSITORY', '')
+        
+        if not Config._logged:
+            self._log_config()
+            Config._logged = True
     
     def _validate_config(self):
         """Validate that required configuration is present."""
@@ -76,37 +84,71 @@ class Config:
             )
         
         # Check if running in GitHub Actions vs locally
-        if self.github_token and not os.getenv('GITHUB_ACTIONS'):
+        if self.github_token and not self.running_in_actions:
             logger.info("Running locally with GitHub token - issues creation may fail due to permissions")
-        elif os.getenv('GITHUB_ACTIONS'):
+        elif self.running_in_actions:
             logger.info("Running in GitHub Actions - full permissions available")
     
     def _log_config(self):
         """Log the current configuration (without sensitive data)."""
         
+        # Skip building the banner entirely when INFO is filtered out
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        
+        def status(configured) -> str:
+            return 'Configured' if configured else 'Not configured'
+        
         logger.info("Configuration loaded:")
-        logger.info(f"  GitHub repo: {self.github_repo or 'Not configured'}")
-        logger.info(f"  GitHub token: {'Configured' if self.github_token else 'Not configured'}")
-        logger.info(f"  Email: {'Configured' if self.notification_email else 'Not configured'}")
-        logger.info(f"  Pushover: {'Configured' if self.pushover_token and self.pushover_user else 'Not configured'}")
-        logger.info(f"  Pushbullet: {'Configured' if self.pushbullet_token else 'Not configured'}")
-        logger.info(f"  ntfy: {'Configured' if self.ntfy_topic else 'Not configured'}")
-        logger.info(f"  Webhook: {'Configured' if self.webhook_url else 'Not configured'}")
-        logger.info(f"  Check interval: {self.check_interval} seconds")
-        logger.info(f"  Request timeout: {self.request_timeout} seconds")
-        logger.info(f"  Log level: {self.log_level}")
+        logger.info("  GitHub repo: %s", self.github_repo or 'Not configured')
+        logger.info("  GitHub token: %s", status(self.github_token))
+        logger.info("  Email: %s", status(self.notification_email))
+        logger.info("  Pushover: %s", status(self.pushover_token and self.pushover_user))
+        logger.info("  Pushbullet: %s", status(self.pushbullet_token))
+        logger.info("  ntfy: %s", status(self.ntfy_topic))
+        logger.info("  Webhook: %s", status(self.webhook_url))
+        logger.info("  Check interval: %s seconds", self.check_interval)
+        logger.info("  Request timeout: %s seconds", self.request_timeout)
+        logger.info("  Locations cache: %s (%s seconds)", self.locations_file, self.locations_ttl)
+        logger.info("  Log level: %s", self.log_level)
     
-    @property
+    @cached_property
     def has_github_config(self) -> bool:
         """Check if GitHub notification is properly configured."""
         return bool(self.github_token and self.github_repo)
     
-    @property
+    @cached_property
     def has_email_config(self) -> bool:
         """Check if email notification is properly configured."""
         return bool(self.notification_email and self.email_password)
     
-    @property
+    @cached_property
     def has_webhook_config(self) -> bool:
         """Check if webhook notification is properly configured."""
-        return bool(self.webhook_url)
\ No newline at end of file
+        return bool(self.webhook_url)
+    
+    @cached_property
+    def has_pushover_config(self) -> bool:
+        """Check if Pushover notification is properly configured."""
+        return bool(self.pushover_token and self.pushover_user)
+    
+    @cached_property
+    def has_pushbullet_config(self) -> bool:
+        """Check if Pushbullet notification is properly configured."""
+        return bool(self.pushbullet_token)
+    
+    @cached_property
+    def has_ntfy_config(self) -> bool:
+        """Check if ntfy notification is properly configured."""
+        return bool(self.ntfy_topic)
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Get the shared configuration instance.
+    
+    Returns:
+        Config built from the environment on first call and reused afterwards
+    """
+    return Config()
\ No newline at end of file
@@ -7,34 +7,42 @@ and sends notifications when appointments become available.
 """
 
 import logging
+import os
 import sys
 import time
 from datetime import datetime
 
-from config import Config
+from config import get_config
 from scraper import BerlinServiceScraper
 from notifier import NotificationManager
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('logs/monitor.log', mode='a')
-    ]
-)
+LOG_FILE = 'logs/monitor.log'
 
 logger = logging.getLogger(__name__)
 
 
+def configure_logging():
+    """Configure logging to stdout, plus the log file when LOG_TO_FILE is set."""
+    handlers = [logging.StreamHandler(sys.stdout)]
+    
+    if os.environ.get('LOG_TO_FILE'):
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+        handlers.append(logging.FileHandler(LOG_FILE, mode='a'))
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
 def main():
     """Main function to run the appointment monitor."""
     try:
         logger.info("Starting Berlin Service Appointment Monitor")
         
         # Initialize configuration
-        config = Config()
+        config = get_config()
         
         # Initialize scraper and notifier
         scraper = BerlinServiceScraper(config)
@@ -45,22 +53,26 @@ def main():
         appointments = scraper.check_appointments()
         
         if appointments:
-            logger.info(f"Found {len(appointments)} available appointments!")
-            
-            # Send notifications
-            message = scraper.format_appointment_message(appointments)
-            notifier.send_notification("🎉 Berlin Service Appointments Available!", message)
+            logger.info("Found %d available appointments!", len(appointments))
             
-            logger.info("Notifications sent successfully")
+            # Send notifications, skipping message formatting if nothing would be sent
+            if notifier.any_channel_enabled:
+                message = scraper.format_appointment_message(appointments)
+                notifier.send_notification("🎉 Berlin Service Appointments Available!", message)
+                
+                logger.info("Notifications sent successfully")
+            else:
+                logger.warning("No notification channels configured, appointments not announced")
         else:
             logger.info("No appointments currently available")
             
         logger.info("Monitor run completed successfully")
         
     except Exception as e:
-        logger.error(f"Error during monitoring: {str(e)}", exc_info=True)
+        logger.error("Error during monitoring: %s", e, exc_info=True)
         sys.exit(1)
 
 
 if __name__ == "__main__":
+    configure_logging()
     main()
\ No newline at end of file
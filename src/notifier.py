@@ -4,20 +4,130 @@ Notification Manager
 This module handles sending notifications through various channels:
 - GitHub Issues
 - Email
+- Mobile push (Pushover, Pushbullet, ntfy.sh)
 - Webhooks (Discord, Slack, etc.)
 """
 
+import atexit
 import logging
-import smtplib
 import requests
 import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional
+from urllib.parse import urlparse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+    import json
 
 logger = logging.getLogger(__name__)
 
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+PUSHBULLET_URL = "https://api.pushbullet.com/v2/pushes"
+WEBHOOK_USERNAME = 'Berlin Appointment Monitor'
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def _dumps(payload: dict) -> bytes:
+    """
+    Serialize a JSON request body, using orjson when it is installed.
+    
+    Args:
+        payload: JSON-serializable payload
+        
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
+
+
+def _discord_payload(title: str, message: str, timestamp: str) -> dict:
+    """Build a Discord webhook payload."""
+    return {
+        'content': f"**{title}**\n\n{message}",
+        'username': WEBHOOK_USERNAME
+    }
+
+
+def _slack_payload(title: str, message: str, timestamp: str) -> dict:
+    """Build a Slack webhook payload."""
+    return {
+        'text': f"*{title}*\n\n{message}",
+        'username': WEBHOOK_USERNAME
+    }
+
+
+def _generic_payload(title: str, message: str, timestamp: str) -> dict:
+    """Build a payload for any other webhook receiver."""
+    return {
+        'title': title,
+        'message': message,
+        'timestamp': timestamp
+    }
+
+
+# Webhook host -> (flavor, payload builder)
+WEBHOOK_FLAVORS = {
+    'discord.com': ('discord', _discord_payload),
+    'discordapp.com': ('discord', _discord_payload),
+    'hooks.slack.com': ('slack', _slack_payload),
+}
+GENERIC_WEBHOOK = ('generic', _generic_payload)
+
+
+def _detect_webhook_flavor(url: Optional[str]):
+    """
+    Work out which service a webhook URL points at.
+    
+    Args:
+        url: Webhook URL
+        
+    Returns:
+        Tuple of (flavor name, payload builder)
+    """
+    host = (urlparse(url or '').hostname or '').lower()
+    # Also match subdomains such as ptb.discord.com
+    parent = host.split('.', 1)[-1]
+    return WEBHOOK_FLAVORS.get(host) or WEBHOOK_FLAVORS.get(parent, GENERIC_WEBHOOK)
+
+
+# smtplib is only needed when email is configured, so import it on first use
+_smtplib = None
+
+
+def _lazy_smtp():
+    """
+    Import smtplib on first use and cache the module.
+    
+    Returns:
+        The smtplib module
+    """
+    global _smtplib
+    if _smtplib is None:
+        import smtplib
+        _smtplib = smtplib
+    return _smtplib
+
+
+# Managers still alive at exit get their connections closed. A WeakSet keeps
+# the exit hook from pinning every manager ever created in memory
+_open_managers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_managers():
+    """Close the network resources of every manager still alive at exit."""
+    for manager in list(_open_managers):
+        manager.close()
+
 
 class NotificationManager:
     """Manages sending notifications through multiple channels."""
@@ -33,6 +143,65 @@ class NotificationManager:
         self.pushbullet_token = config.pushbullet_token
         self.ntfy_topic = config.ntfy_topic
         
+        # Shared HTTP session so every channel reuses pooled connections
+        self._session = requests.Session()
+        self._session.headers.update({'Accept-Encoding': 'gzip'})
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.3)
+        )
+        self._session.mount('https://', adapter)
+        
+        # Per-channel values that never change at runtime
+        self._github_url = f"https://api.github.com/repos/{self.github_repo}/issues"
+        self._github_headers = {
+            'Authorization': f'token {self.github_token}',
+            'Accept': 'application/vnd.github.v3+json',
+            'Content-Type': 'application/json'
+        }
+        self._pushbullet_headers = {
+            'Authorization': f'Bearer {self.pushbullet_token}',
+            'Content-Type': 'application/json'
+        }
+        self._pushover_data = {
+            'token': self.pushover_token,
+            'user': self.pushover_user,
+            'priority': 1,  # High priority
+            'sound': 'bugle'  # Attention-grabbing sound
+        }
+        self._ntfy_url = f"https://ntfy.sh/{self.ntfy_topic}"
+        self._ntfy_headers = {
+            'Content-Type': 'text/plain; charset=utf-8',
+            'Priority': 'high',
+            'Tags': 'appointment,berlin'
+        }
+        
+        self._webhook_flavor, self._webhook_builder = _detect_webhook_flavor(config.webhook_url)
+        
+        # Dispatch table of the channels that are actually configured
+        channels = [
+            ('github', config.has_github_config, self._send_github_issue),
+            ('email', config.has_email_config, self._send_email),
+            ('pushover', config.has_pushover_config, self._send_pushover),
+            ('pushbullet', config.has_pushbullet_config, self._send_pushbullet),
+            ('ntfy', config.has_ntfy_config, self._send_ntfy),
+            ('webhook', config.has_webhook_config, self._send_webhook),
+        ]
+        self._senders = [(name, sender) for name, configured, sender in channels if configured]
+        
+        # Open appointment-alert issue that further alerts are appended to
+        self._open_issue_number = None
+        
+        # SMTP connection is opened on the first email and kept for reuse
+        self._smtp = None
+        _open_managers.add(self)
+        
+    @property
+    def any_channel_enabled(self) -> bool:
+        """Check if at least one notification channel is configured."""
+        return bool(self._senders)
+    
     def send_notification(self, title: str, message: str) -> bool:
         """
         Send notification through all configured channels.
@@ -44,54 +213,69 @@ class NotificationManager:
         Returns:
             True if at least one notification was sent successfully
         """
-        success = False
+        if not self.any_channel_enabled:
+            logger.info("No notification channels configured, skipping notification")
+            return False
         
-        # Try GitHub Issues notification
-        if self._send_github_issue(title, message):
-            success = True
-            
-        # Try email notification
-        if self._send_email(title, message):
-            success = True
-            
-        # Try mobile push notifications
-        if self._send_pushover(title, message):
-            success = True
-            
-        if self._send_pushbullet(title, message):
-            success = True
-            
-        if self._send_ntfy(title, message):
-            success = True
-            
-        return success
+        # One timestamp for the whole alert, shared by every channel
+        timestamp = datetime.now().isoformat()
+        
+        # Channels are independent I/O, so run them concurrently and wait for
+        # the slowest one. Every sender must run, so collect all results
+        # before reducing them.
+        with ThreadPoolExecutor(max_workers=len(self._senders)) as executor:
+            results = list(executor.map(
+                lambda entry: entry[1](title, message, timestamp), self._senders
+            ))
+        
+        return any(results)
     
-    def _send_github_issue(self, title: str, message: str) -> bool:
+    def _send_github_issue(self, title: str, message: str, timestamp: str) -> bool:
         """
-        Create a GitHub issue with the notification.
+        Post the notification to GitHub.
+        
+        Alerts are appended as a comment to the open appointment-alert issue
+        if there is one; otherwise a new issue is created.
         
         Args:
             title: Issue title
             message: Issue body
+            timestamp: ISO timestamp of the alert
             
         Returns:
-            True if issue was created successfully
+            True if the issue or comment was created successfully
         """
         try:
-            if not self.github_token or not self.github_repo:
-                logger.info("GitHub token or repo not configured, skipping GitHub issue")
-                return False
+            issue_number = self._open_issue_number or self._find_open_issue()
+            
+            if issue_number:
+                comment_body = f"## {title}\n\n{message}\n\n---\n*Posted automatically at {timestamp}*"
+                response = self._session.post(
+                    f"{self._github_url}/{issue_number}/comments",
+                    data=_dumps({'body': comment_body}),
+                    headers=self._github_headers,
+                    timeout=30
+                )
                 
-            url = f"https://api.github.com/repos/{self.github_repo}/issues"
-            
-            headers = {
-                'Authorization': f'token {self.github_token}',
-                'Accept': 'application/vnd.github.v3+json',
-                'Content-Type': 'application/json'
-            }
+                if response.status_code not in (403, 404):
+                    response.raise_for_status()
+                    self._open_issue_number = issue_number
+                    
+                    if logger.isEnabledFor(logging.INFO):
+                        comment_url = response.json().get('html_url', 'Unknown')
+                        logger.info("GitHub issue comment added successfully: %s", comment_url)
+                    return True
+                
+                # The issue is gone (deleted or transferred) or cannot take
+                # comments (locked), so open a new one instead
+                if response.status_code == 404:
+                    logger.info("GitHub issue #%s no longer exists, creating a new issue", issue_number)
+                else:
+                    logger.warning("Cannot comment on GitHub issue #%s (403), creating a new issue", issue_number)
+                self._open_issue_number = None
             
             # Add timestamp and labels
-            issue_body = f"{message}\n\n---\n*Created automatically at {datetime.now().isoformat()}*"
+            issue_body = f"{message}\n\n---\n*Created automatically at {timestamp}*"
             
             data = {
                 'title': title,
@@ -99,11 +283,12 @@ class NotificationManager:
                 'labels': ['appointment-alert', 'automated']
             }
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = self._session.post(self._github_url, data=_dumps(data), headers=self._github_headers, timeout=30)
             response.raise_for_status()
             
-            issue_url = response.json().get('html_url', 'Unknown')
-            logger.info(f"GitHub issue created successfully: {issue_url}")
+            issue = response.json()
+            self._open_issue_number = issue.get('number')
+            logger.info("GitHub issue created successfully: %s", issue.get('html_url', 'Unknown'))
             return True
             
         except requests.exceptions.HTTPError as e:
@@ -114,209 +299,216 @@ class NotificationManager:
                     "Issues will be created automatically when running in GitHub Actions."
                 )
             else:
-                logger.error(f"GitHub API error ({e.response.status_code}): {str(e)}")
+                logger.error("GitHub API error (%s): %s", e.response.status_code, e)
             return False
         except Exception as e:
-            logger.error(f"Failed to create GitHub issue: {str(e)}")
+            logger.error("Failed to create GitHub issue: %s", e)
             return False
     
-    def _send_email(self, title: str, message: str) -> bool:
+    def _find_open_issue(self) -> Optional[int]:
+        """
+        Look up the most recent open appointment-alert issue.
+        
+        A failed lookup must not cost the alert, so errors are logged and
+        treated like having no open issue.
+        
+        Returns:
+            Issue number, or None if there is no open alert issue or the
+            lookup failed
+        """
+        try:
+            response = self._session.get(
+                self._github_url,
+                params={'labels': 'appointment-alert', 'state': 'open', 'per_page': 1},
+                headers=self._github_headers,
+                timeout=30
+            )
+            response.raise_for_status()
+            issues = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("Could not look up open GitHub issue, creating a new one: %s", e)
+            return None
+        
+        if not issues:
+            return None
+        
+        self._open_issue_number = issues[0]['number']
+        return self._open_issue_number
+    
+    def _send_email(self, title: str, message: str, timestamp: str) -> bool:
         """
         Send email notification.
         
         Args:
             title: Email subject
             message: Email body
+            timestamp: ISO timestamp of the alert
             
         Returns:
             True if email was sent successfully
         """
         try:
-            email = self.config.notification_email
-            password = self.config.email_password
+            from email.message import EmailMessage
             
-            if not email or not password:
-                logger.info("Email credentials not configured, skipping email notification")
-                return False
+            smtplib = _lazy_smtp()
+            email = self.config.notification_email
             
             # Create message
-            msg = MIMEMultipart()
+            msg = EmailMessage()
             msg['From'] = email
             msg['To'] = email  # Send to self
             msg['Subject'] = title
-            
-            # Add body
-            msg.attach(MIMEText(message, 'plain'))
-            
-            # Send email using Gmail SMTP
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(email, password)
-            
-            text = msg.as_string()
-            server.sendmail(email, email, text)
-            server.quit()
-            
-            logger.info(f"Email notification sent successfully to {email}")
+            msg.set_content(message)
+            
+            # Send email over the persistent Gmail SMTP connection,
+            # reconnecting once if the server dropped it since the last send
+            try:
+                self._get_smtp().send_message(msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPSenderRefused):
+                logger.info("SMTP connection lost, reconnecting")
+                self._close_smtp()
+                self._get_smtp().send_message(msg)
+            
+            logger.info("Email notification sent successfully to %s", email)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to send email notification: {str(e)}")
+            logger.error("Failed to send email notification: %s", e)
             return False
     
-    def _send_webhook(self, title: str, message: str) -> bool:
+    def _get_smtp(self):
+        """
+        Get the SMTP connection, opening and authenticating it if needed.
+        
+        Returns:
+            Logged-in SMTP connection to Gmail
+        """
+        if self._smtp is None:
+            server = _lazy_smtp().SMTP('smtp.gmail.com', 587)
+            server.starttls()
+            server.login(self.config.notification_email, self.config.email_password)
+            self._smtp = server
+        return self._smtp
+    
+    def _close_smtp(self):
+        """Close the SMTP connection if one is open."""
+        server, self._smtp = self._smtp, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except _lazy_smtp().SMTPException:
+            server.close()
+        except OSError:
+            pass
+    
+    def close(self):
+        """Release network resources held by the notification manager."""
+        self._close_smtp()
+        self._session.close()
+    
+    def _send_webhook(self, title: str, message: str, timestamp: str) -> bool:
         """
         Send webhook notification (Discord, Slack, etc.).
         
         Args:
             title: Notification title
             message: Notification message
+            timestamp: ISO timestamp of the alert
             
         Returns:
             True if webhook was sent successfully
         """
         try:
-            webhook_url = self.config.webhook_url
-            
-            if not webhook_url:
-                logger.info("Webhook URL not configured, skipping webhook notification")
-                return False
+            payload = self._webhook_builder(title, message, timestamp)
             
-            # Format for Discord webhook (can be adapted for other services)
-            if 'discord' in webhook_url.lower():
-                payload = {
-                    'content': f"**{title}**\n\n{message}",
-                    'username': 'Berlin Appointment Monitor'
-                }
-            elif 'slack' in webhook_url.lower():
-                payload = {
-                    'text': f"*{title}*\n\n{message}",
-                    'username': 'Berlin Appointment Monitor'
-                }
-            else:
-                # Generic webhook format
-                payload = {
-                    'title': title,
-                    'message': message,
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            response = requests.post(webhook_url, json=payload, timeout=30)
+            response = self._session.post(self.config.webhook_url, data=_dumps(payload), headers=JSON_HEADERS, timeout=30)
             response.raise_for_status()
             
             logger.info("Webhook notification sent successfully")
             return True
             
         except Exception as e:
-            logger.error(f"Failed to send webhook notification: {str(e)}")
+            logger.error("Failed to send webhook notification: %s", e)
             return False
     
-    def _send_pushover(self, title: str, message: str) -> bool:
+    def _send_pushover(self, title: str, message: str, timestamp: str) -> bool:
         """
         Send push notification via Pushover.
         
         Args:
             title: Notification title
             message: Notification message
+            timestamp: ISO timestamp of the alert
             
         Returns:
             True if notification was sent successfully
         """
         try:
-            if not self.pushover_token or not self.pushover_user:
-                logger.info("Pushover credentials not configured, skipping")
-                return False
-            
-            url = "https://api.pushover.net/1/messages.json"
+            data = dict(self._pushover_data, title=title, message=message)
             
-            data = {
-                'token': self.pushover_token,
-                'user': self.pushover_user,
-                'title': title,
-                'message': message,
-                'priority': 1,  # High priority
-                'sound': 'bugle'  # Attention-grabbing sound
-            }
-            
-            response = requests.post(url, data=data, timeout=30)
+            response = self._session.post(PUSHOVER_URL, data=data, timeout=30)
             response.raise_for_status()
             
             logger.info("Pushover notification sent successfully")
             return True
             
         except Exception as e:
-            logger.error(f"Failed to send Pushover notification: {str(e)}")
+            logger.error("Failed to send Pushover notification: %s", e)
             return False
     
-    def _send_pushbullet(self, title: str, message: str) -> bool:
+    def _send_pushbullet(self, title: str, message: str, timestamp: str) -> bool:
         """
         Send push notification via Pushbullet.
         
         Args:
             title: Notification title
             message: Notification message
+            timestamp: ISO timestamp of the alert
             
         Returns:
             True if notification was sent successfully
         """
         try:
-            if not self.pushbullet_token:
-                logger.info("Pushbullet token not configured, skipping")
-                return False
-            
-            url = "https://api.pushbullet.com/v2/pushes"
-            
-            headers = {
-                'Authorization': f'Bearer {self.pushbullet_token}',
-                'Content-Type': 'application/json'
-            }
-            
             data = {
                 'type': 'note',
                 'title': title,
                 'body': message
             }
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = self._session.post(PUSHBULLET_URL, data=_dumps(data), headers=self._pushbullet_headers, timeout=30)
             response.raise_for_status()
             
             logger.info("Pushbullet notification sent successfully")
             return True
             
         except Exception as e:
-            logger.error(f"Failed to send Pushbullet notification: {str(e)}")
+            logger.error("Failed to send Pushbullet notification: %s", e)
             return False
     
-    def _send_ntfy(self, title: str, message: str) -> bool:
+    def _send_ntfy(self, title: str, message: str, timestamp: str) -> bool:
         """
         Send push notification via ntfy.sh.
         
         Args:
             title: Notification title
             message: Notification message
+            timestamp: ISO timestamp of the alert
             
         Returns:
             True if notification was sent successfully
         """
         try:
-            if not self.ntfy_topic:
-                logger.info("ntfy topic not configured, skipping")
-                return False
-            
-            url = f"https://ntfy.sh/{self.ntfy_topic}"
-            
-            headers = {
-                'Title': title,
-                'Priority': 'high',
-                'Tags': 'appointment,berlin'
-            }
+            headers = dict(self._ntfy_headers, Title=title)
             
-            response = requests.post(url, data=message.encode('utf-8'), headers=headers, timeout=30)
+            # The body has to be bytes: http.client encodes str bodies as
+            # ISO-8859-1, which cannot represent the emoji in our alerts
+            response = self._session.post(self._ntfy_url, data=message.encode('utf-8'), headers=headers, timeout=30)
             response.raise_for_status()
             
             logger.info("ntfy notification sent successfully")
             return True
             
         except Exception as e:
-            logger.error(f"Failed to send ntfy notification: {str(e)}")
+            logger.error("Failed to send ntfy notification: %s", e)
             return False
\ No newline at end of file
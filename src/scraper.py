@@ -4,36 +4,484 @@ Berlin Service Website Scraper
 This module handles scraping the Berlin service website for appointment availability.
 """
 
+import json
 import logging
+import os
+import re
 import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree, html
+from lxml.html import HtmlElement, soupparser
+from typing import List, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+import threading
 import time
-import random
 
 logger = logging.getLogger(__name__)
 
+# Phrases that mean the page explicitly has no appointments
+NO_APPOINTMENT_PHRASES = (
+    'keine termine', 'no appointments', 'ausgebucht', 'nicht verfügbar',
+    'derzeit keine termine', 'currently no appointments',
+    'alle termine vergeben', 'all appointments taken',
+    'keine verfügbaren termine', 'no available appointments',
+    'keine freien termine', 'no free appointments'
+)
+
+# Phrases that explicitly confirm availability
+POSITIVE_AVAILABILITY_PHRASES = (
+    'termine verfügbar', 'appointments available',
+    'freie termine', 'free appointments',
+    'buchbare termine', 'bookable appointments',
+    'termin wählen', 'choose appointment',
+    'verfügbare zeiten', 'available times'
+)
+
+# Navigation links that are never a location
+NAVIGATION_LINK_TEXTS = ('standorte a-z', 'nach behörden', 'weitere standorte')
+
+# Berlin districts that have a Standesamt
+DISTRICTS = (
+    'marzahn', 'hellersdorf', 'spandau', 'mitte', 'charlottenburg', 'wilmersdorf',
+    'tempelhof', 'schöneberg', 'neukölln', 'friedrichshain', 'kreuzberg',
+    'pankow', 'lichtenberg', 'reinickendorf', 'steglitz', 'zehlendorf', 'treptow'
+)
+
+# Select names that suggest a date/time picker
+DATE_SELECT_KEYWORDS = ('date', 'time', 'termin')
+
+# Input types used by calendar/date pickers
+CALENDAR_INPUT_TYPES = ('date', 'datetime-local')
+
+
+def _phrase_pattern(phrases) -> re.Pattern:
+    """Compile phrases into one alternation so a text is scanned in a single pass."""
+    return re.compile('|'.join(re.escape(phrase) for phrase in phrases))
+
+
+_NO_APPOINTMENTS_RE = _phrase_pattern(NO_APPOINTMENT_PHRASES)
+_DISTRICTS_RE = _phrase_pattern(DISTRICTS)
+_NAVIGATION_LINK_RE = _phrase_pattern(NAVIGATION_LINK_TEXTS)
+
+# Link targets that lead into the appointment booking flow
+_BOOKING_HREF_RE = re.compile(r'termin|buchung', re.IGNORECASE)
+
+# Button/link texts that start a booking ("Termin buchen", "Termin vereinbaren", ...)
+_BOOKING_RE = re.compile(r'buchen|termin\s*vereinbaren|book\s+appointment', re.IGNORECASE)
+
+# Button/link texts that are a time slot, e.g. "09:00", "14:30:00", "9:15 Uhr"
+_TIME_SLOT_RE = re.compile(r'\s*\d{1,2}:\d{2}(?::\d{2})?(?:\s*uhr)?\s*$', re.IGNORECASE)
+
+# XPath 1.0 has no lower-case(), so fold case with translate() instead
+_XPATH_LOWER_TEXT = "translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÜ', 'abcdefghijklmnopqrstuvwxyzäöü')"
+
+
+def _text_node_predicate(phrases) -> str:
+    """Build an XPath predicate matching text nodes that contain any of the phrases."""
+    return ' or '.join(f"contains({_XPATH_LOWER_TEXT}, '{phrase}')" for phrase in phrases)
+
+
+# Text nodes a visitor actually sees; script and style contents are code
+_VISIBLE_TEXT = etree.XPath("//text()[not(ancestor::script or ancestor::style)]")
+
+# Evaluated inside libxml2, without building the whole page text in Python
+_COUNT_POSITIVE_AVAILABILITY_TEXTS = etree.XPath(
+    "count(//text()[not(ancestor::script or ancestor::style)]"
+    f"[{_text_node_predicate(POSITIVE_AVAILABILITY_PHRASES)}])"
+)
+
+# Byte-level version for scanning raw (UTF-8) response bodies as they stream in
+_NO_APPOINTMENTS_BYTES_RE = re.compile(
+    b'|'.join(re.escape(phrase.encode('utf-8')) for phrase in NO_APPOINTMENT_PHRASES)
+)
+_NO_APPOINTMENTS_MAX_BYTES = max(len(phrase.encode('utf-8')) for phrase in NO_APPOINTMENT_PHRASES)
+
+# <a ...>...</a> elements (attributes, content) and the name and value of
+# each of their attributes, enough to pick plain location links out of the
+# raw main page without parsing it. Quoted values may contain '>'
+_ANCHOR_RE = re.compile(rb'<a\b((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>(.*?)</a\s*>', re.IGNORECASE | re.DOTALL)
+_ATTRIBUTE_RE = re.compile(rb'([^\s"\'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+)))?')
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Number of main page versions whose locations are remembered
+LOCATIONS_BY_VERSION_SIZE = 8
+
+# Decoded main page bodies smaller than this are stubs, not the service page
+MIN_PAGE_BYTES = 2048
+
+# (second, formatted) of the last timestamp; replaced as a whole so threads
+# never see a half-updated pair
+_now_cache = (0, "")
+
+
+def _now_str() -> str:
+    """Return the current local time as TIMESTAMP_FORMAT, formatted once per second."""
+    global _now_cache
+    now = int(time.time())
+    second, formatted = _now_cache
+    if now != second:
+        formatted = time.strftime(TIMESTAMP_FORMAT, time.localtime(now))
+        _now_cache = (now, formatted)
+    return formatted
+
+
+def _find_no_appointments_indicator(tree: HtmlElement) -> Optional[str]:
+    """
+    Find a "no appointments" phrase in the visible text of a page.
+    
+    The visible text nodes are joined and their whitespace normalized once,
+    so a phrase split by inline markup ("<b>keine</b> Termine") still matches.
+    
+    Args:
+        tree: Parsed page (possibly still being parsed)
+        
+    Returns:
+        The phrase found, or None
+    """
+    page_text = ' '.join(''.join(_VISIBLE_TEXT(tree)).split()).lower()
+    match = _NO_APPOINTMENTS_RE.search(page_text)
+    return match.group(0) if match else None
+
+
+def _href_attribute(attributes: bytes) -> Optional[bytes]:
+    """
+    Pick the href value out of the raw attributes of an <a> tag.
+    
+    Args:
+        attributes: Everything between '<a' and the closing '>'
+        
+    Returns:
+        The href value, or None if the tag has no href
+    """
+    for name, double_quoted, single_quoted, unquoted in _ATTRIBUTE_RE.findall(attributes):
+        if name.lower() == b'href':
+            return double_quoted or single_quoted or unquoted
+    return None
+
+
+def _location_link(href: str, link_text: str) -> Optional[Dict[str, str]]:
+    """
+    Check whether a link points to a Standesamt location.
+    
+    Args:
+        href: Link target
+        link_text: Stripped link text
+        
+    Returns:
+        Location dictionary with name and URL, or None for any other link
+    """
+    # Skip if no meaningful text
+    if not link_text or len(link_text) < 5:
+        return None
+    
+    # Skip email links and generic navigation
+    if '@' in href or 'mailto:' in href:
+        return None
+    
+    text_lower = link_text.lower()
+    
+    # Most links are not about a Standesamt at all, so rule those out first
+    if 'standesamt' not in text_lower:
+        return None
+    
+    # Skip generic navigation links
+    if _NAVIGATION_LINK_RE.search(text_lower):
+        return None
+    
+    # Look for actual Standesamt location names or appointment booking links
+    if not (_DISTRICTS_RE.search(text_lower) or _BOOKING_HREF_RE.search(href)):
+        return None
+    
+    full_url = href if href.startswith('http') else f"https://service.berlin.de{href}"
+    return {
+        'name': link_text,
+        'url': full_url
+    }
+
+
+def _is_calendar_input(element: HtmlElement) -> bool:
+    """Check if an input element is a calendar/date picker."""
+    return (
+        element.get('type') in CALENDAR_INPUT_TYPES
+        and 'calendar' in (element.get('class') or '').lower()
+    )
+
+
+def _is_date_select(element: HtmlElement) -> bool:
+    """Check if a select element picks a date or time."""
+    name = (element.get('name') or '').lower()
+    return any(keyword in name for keyword in DATE_SELECT_KEYWORDS)
+
+
+def _page_encoding(response: requests.Response) -> str:
+    """
+    Get the character set of a fetched page.
+    
+    Args:
+        response: HTTP response for the page
+        
+    Returns:
+        Charset declared by the server, or UTF-8 (what service.berlin.de serves)
+    """
+    if 'charset' in response.headers.get('Content-Type', '').lower():
+        return response.encoding
+    return 'utf-8'
+
+
+# Comments, processing instructions and whitespace-only text are dropped
+# while parsing, since none of the checks look at them
+_PARSER_OPTIONS = dict(remove_comments=True, remove_pis=True, remove_blank_text=True)
+
+
+def _html_parser(encoding: str = 'utf-8') -> html.HTMLParser:
+    """
+    Create an lxml HTML parser for a page.
+    
+    A new parser is needed per page because parsers must not be shared
+    between threads.
+    
+    Args:
+        encoding: Character set of the page
+        
+    Returns:
+        HTML parser producing HtmlElement trees
+    """
+    return html.HTMLParser(encoding=encoding, **_PARSER_OPTIONS)
+
+
+def _html_pull_parser(encoding: str = 'utf-8') -> etree.HTMLPullParser:
+    """
+    Create an incremental lxml HTML parser that reports the document root.
+    
+    The root is reported as a 'start' event as soon as it is parsed, so the
+    partially built tree can be inspected while the rest is still arriving.
+    
+    Args:
+        encoding: Character set of the page
+        
+    Returns:
+        Pull parser producing HtmlElement trees
+    """
+    parser = etree.HTMLPullParser(events=('start',), tag='html', encoding=encoding, **_PARSER_OPTIONS)
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+    return parser
+
+
+def _parse_html(content: bytes, encoding: str = 'utf-8') -> HtmlElement:
+    """
+    Parse a page into an lxml tree.
+    
+    The C-backed lxml parser is used first; BeautifulSoup (through
+    lxml.html.soupparser) is kept as a fallback for markup lxml rejects.
+    
+    Args:
+        content: Raw response body
+        encoding: Character set of the body
+        
+    Returns:
+        Root element of the parsed document
+    """
+    try:
+        return html.fromstring(content, parser=_html_parser(encoding))
+    except (etree.ParserError, ValueError) as e:
+        logger.info(f"lxml could not parse page ({e}), falling back to BeautifulSoup")
+        return soupparser.fromstring(content)
+
+
+# Technical details listed under an appointment when their count is non-zero
+APPOINTMENT_DETAIL_LINES = (
+    ('enabled_buttons', "  ✅ {} enabled booking buttons"),
+    ('time_slots', "  🕐 {} time slots available"),
+    ('calendar_elements', "  📅 {} calendar elements"),
+    ('date_selects', "  📝 {} date selection forms"),
+)
+
+# Static instructions at the end of every notification message
+MESSAGE_FOOTER_LINES = (
+    "🚀 **Action Required:**",
+    "1. Click the link above",
+    "2. Select your preferred Standesamt location",
+    "3. Choose an available appointment slot",
+    "4. Complete the booking process",
+    "",
+    "📍 **Available Locations May Include:**",
+    "- Standesamt Marzahn-Hellersdorf",
+    "- Standesamt Spandau",
+    "- Other Berlin Standesamt offices",
+    "",
+    "🔍 **Monitoring Details:**",
+    "- Service: Namensrechtliche Erklärung",
+)
+
+
+class Appointment(NamedTuple):
+    """An appointment availability found on the service website."""
+    
+    type: str
+    url: str
+    found_at: str
+    details: str
+    enabled_buttons: int = 0
+    calendar_elements: int = 0
+    time_slots: int = 0
+    availability_texts: int = 0
+    date_selects: int = 0
+    location: Optional[str] = None
+
+
+def _appointment_lines(index: int, apt: Appointment):
+    """Yield the notification message lines describing one appointment."""
+    yield f"📍 Appointment {index}:"
+    yield f"  Type: {apt.type}"
+    yield f"  Location: {apt.location or 'Main page'}"
+    if apt.location:
+        yield f"  🏢 Standesamt: {apt.location}"
+    yield f"  🔗 URL: {apt.url}"
+    yield f"  ⏰ Found at: {apt.found_at}"
+    yield f"  📊 Indicators: {apt.details}"
+    yield ""
+    
+    # Add technical details
+    for field, template in APPOINTMENT_DETAIL_LINES:
+        count = getattr(apt, field)
+        if count > 0:
+            yield template.format(count)
+    yield ""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that paces outgoing requests.
+    
+    Up to ``burst`` requests go out immediately; after that callers wait so
+    the average stays at ``rate`` requests per second.
+    """
+    
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.05):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, sleeping until it is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            
+            # Reserve the token now; a negative balance queues later callers
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        
+        if wait:
+            time.sleep(wait)
+    
+    def observe(self, response: requests.Response):
+        """
+        Slow down when the server signals rate limiting.
+        
+        The retrying adapter already waits out 429 and 503 responses within a
+        request; this sees the final response once its retries are used up
+        and lowers the rate for the requests that follow.
+        
+        Args:
+            response: Response to inspect for a 429/503 status, Retry-After or
+                X-RateLimit-Remaining
+        """
+        headers = response.headers
+        if (response.status_code in (429, 503) or 'Retry-After' in headers
+                or headers.get('X-RateLimit-Remaining') == '0'):
+            with self._lock:
+                self.rate = max(self.min_rate, self.rate / 2)
+            logger.info(f"Server is rate limiting, slowing down to {self.rate:.2f} requests/second")
+
+
+def _create_session() -> requests.Session:
+    """
+    Create the HTTP session used to talk to service.berlin.de.
+    
+    Returns:
+        Session with browser-like headers and a pooled, retrying adapter
+    """
+    session = requests.Session()
+    
+    # Set up headers to mimic a real browser
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        # Includes brotli (br) when the brotli package is installed
+        'Accept-Encoding': requests.utils.DEFAULT_ACCEPT_ENCODING,
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    })
+    
+    # Size the connection pool for the concurrent location fetches and
+    # back off on rate limiting or server errors instead of failing the poll.
+    # Once retries run out the last response is returned rather than raised,
+    # so the rate limiter still sees it before raise_for_status fails it
+    retry = Retry(
+        total=3,
+        backoff_factor=1.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=8, pool_maxsize=8)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    
+    return session
+
+
+# Shared by every scraper so they all reuse the same connection pool
+_SESSION = _create_session()
+
 
 class BerlinServiceScraper:
     """Scrapes the Berlin service website for appointment availability."""
     
-    def __init__(self, config):
+    def __init__(self, config, session: Optional[requests.Session] = None):
         self.config = config
         self.base_url = "https://service.berlin.de/dienstleistung/324591/"
-        self.session = requests.Session()
-        
-        # Set up headers to mimic a real browser
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-    
-    def check_appointments(self) -> List[Dict[str, str]]:
+        self.session = session or _SESSION
+        
+        # Pace requests to the service: a short burst, then one every 2 seconds
+        self._rate_limiter = TokenBucket(rate=0.5, burst=3)
+        
+        # Validators of the last download of each page (main page and
+        # locations), used to send conditional requests, and what the pages
+        # parsed to, so an unchanged page is never parsed again
+        self._etag: Dict[str, str] = {}
+        self._last_modified: Dict[str, str] = {}
+        self._cached_locations: List[Dict[str, str]] = []
+        self._cached_result: List[Appointment] = []
+        self._location_results: Dict[str, List[Appointment]] = {}
+        
+        # Locations of recently seen main page versions, keyed by ETag or
+        # Last-Modified and evicted least recently used first
+        self._locations_by_version: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+        
+        # The list of locations rarely changes, so reuse it (also across runs,
+        # through the locations file) without requesting the main page at all
+        self._locations_file = config.locations_file
+        self._locations_ttl = config.locations_ttl
+        self._locations_cache: Optional[Tuple[float, List[Dict[str, str]]]] = self._load_locations_file()
+        
+        # Location URLs are polled over and over with identical requests, so
+        # prepare each one once and only refresh its cookies on later checks
+        self._prepared_requests: Dict[str, requests.PreparedRequest] = {}
+    
+    def check_appointments(self) -> List[Appointment]:
         """
         Check for available appointments on the Berlin service website.
         
@@ -41,30 +489,85 @@ class BerlinServiceScraper:
             List of available appointment slots with details
         """
         try:
+            if self._locations_cache:
+                cached_at, locations = self._locations_cache
+                if time.monotonic() - cached_at < self._locations_ttl:
+                    logger.info(f"Reusing {len(locations)} cached locations, skipping main page")
+                    return self._check_locations_for_appointments(locations)
+            
             logger.info(f"Fetching main page: {self.base_url}")
             
-            # Add random delay to avoid being blocked
-            time.sleep(random.uniform(1, 3))
+            self._rate_limiter.acquire()
+            response = self.session.get(self.base_url, headers=self._conditional_headers(self.base_url), timeout=30)
+            self._rate_limiter.observe(response)
+            
+            if response.status_code == 304:
+                # The main page only lists locations; their availability can
+                # still change, so check them again without re-parsing the page
+                logger.info("Main page not modified since last check, reusing parsed page")
+                if self._cached_locations:
+                    return self._check_locations_for_appointments(self._cached_locations)
+                return self._cached_result
             
-            response = self.session.get(self.base_url, timeout=30)
             response.raise_for_status()
             
             logger.info(f"Successfully fetched main page (status: {response.status_code})")
             
-            # Parse the HTML content
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # A redirect off the service host or a near-empty body is a
+            # maintenance or error stub with nothing to check. Redirects within
+            # service.berlin.de (URL moves, trailing slashes) are still parsed
+            if response.history and urlparse(response.url).hostname != urlparse(self.base_url).hostname:
+                logger.warning(f"Main page redirected off-host to {response.url}, skipping this check")
+                return []
+            if len(response.content) < MIN_PAGE_BYTES:
+                logger.info(f"Main page is only {len(response.content)} bytes, skipping this check")
+                return []
             
-            # First, check if we need to select a location (Standort)
-            locations = self._find_available_locations(soup)
+            # Pin the charset so any response.text access never falls back to
+            # requests' ISO-8859-1 default or charset detection
+            encoding = response.encoding = _page_encoding(response)
+            
+            # A page version seen before (same ETag or Last-Modified, e.g. when
+            # the server ignores conditional requests) lists the same locations
+            version = response.headers.get('ETag') or response.headers.get('Last-Modified')
+            locations = self._locations_by_version.get(version) if version else None
+            if locations is not None:
+                self._locations_by_version.move_to_end(version)
+                logger.info("Main page matches an earlier version, reusing its locations")
+            else:
+                # First, check if we need to select a location (Standort). Plain
+                # location links are found without parsing the page at all
+                locations = self._find_location_links(response.content, encoding)
+            
+            result = []
+            if not locations:
+                # Parse the HTML content
+                tree = _parse_html(response.content, encoding)
+                locations = self._find_available_locations(tree)
+                
+                if not locations:
+                    # No specific locations found, check the main page directly
+                    # This could happen if the appointment selection is on the same page
+                    logger.info("No specific locations found, checking main page for appointments")
+                    result = self._parse_appointments(tree)
+            
+            # Remember the page validators and what the page parsed to
+            self._remember_validators(self.base_url, response)
+            if version and locations:
+                self._locations_by_version[version] = locations
+                if len(self._locations_by_version) > LOCATIONS_BY_VERSION_SIZE:
+                    self._locations_by_version.popitem(last=False)
+            self._cached_locations = locations
+            self._cached_result = result
+            # No locations usually means the page layout changed, so drop the
+            # cached list rather than keep polling stale links
+            self._locations_cache = (time.monotonic(), locations) if locations else None
+            self._save_locations_file(locations)
             
             if locations:
                 logger.info(f"Found {len(locations)} specific locations to check")
                 return self._check_locations_for_appointments(locations)
-            else:
-                # No specific locations found, check the main page directly
-                # This could happen if the appointment selection is on the same page
-                logger.info("No specific locations found, checking main page for appointments")
-                return self._parse_appointments(soup)
+            return result
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Network error while fetching appointments: {str(e)}")
@@ -73,12 +576,147 @@ class BerlinServiceScraper:
             logger.error(f"Error checking appointments: {str(e)}")
             return []
     
-    def _find_available_locations(self, soup: BeautifulSoup) -> List[Dict[str, str]]:
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build the conditional request headers for a page downloaded before.
+        
+        Args:
+            url: Page URL
+            
+        Returns:
+            If-None-Match / If-Modified-Since headers, empty for a new page
+        """
+        headers = {}
+        if url in self._etag:
+            headers['If-None-Match'] = self._etag[url]
+        if url in self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified[url]
+        return headers
+    
+    def _remember_validators(self, url: str, response: requests.Response):
+        """
+        Store the ETag and Last-Modified validators sent with a page.
+        
+        Args:
+            url: Page URL
+            response: Response the page was read from
+        """
+        for validators, header in ((self._etag, 'ETag'), (self._last_modified, 'Last-Modified')):
+            value = response.headers.get(header)
+            if value:
+                validators[url] = value
+            else:
+                validators.pop(url, None)
+    
+    def _forget_locations(self):
+        """Drop every cached location list so the next check reads the main page again."""
+        self._locations_cache = None
+        self._cached_locations = []
+        self._locations_by_version.clear()
+        self._etag.pop(self.base_url, None)
+        self._last_modified.pop(self.base_url, None)
+        self._save_locations_file([])
+    
+    def _load_locations_file(self) -> Optional[Tuple[float, List[Dict[str, str]]]]:
+        """
+        Load locations discovered by an earlier run from the locations file.
+        
+        Returns:
+            (monotonic time the locations were saved, locations), or None if
+            there is no usable file or it is older than the locations TTL
+        """
+        try:
+            with open(self._locations_file, encoding='utf-8') as f:
+                data = json.load(f)
+            age = time.time() - data['saved_at']
+            locations = data['locations']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable locations file {self._locations_file}: {str(e)}")
+            return None
+        
+        if not locations or not 0 <= age < self._locations_ttl:
+            return None
+        
+        logger.info(f"Loaded {len(locations)} locations saved {int(age)} seconds ago")
+        return time.monotonic() - age, locations
+    
+    def _save_locations_file(self, locations: List[Dict[str, str]]):
+        """
+        Save discovered locations for later runs, or remove the file if none were found.
+        
+        Args:
+            locations: Locations found on the main page
+        """
+        try:
+            if not locations:
+                os.remove(self._locations_file)
+                return
+            
+            directory = os.path.dirname(self._locations_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self._locations_file, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'locations': locations}, f, ensure_ascii=False, indent=2)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not update locations file {self._locations_file}: {str(e)}")
+    
+    def _find_location_links(self, content: bytes, encoding: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Find Standesamt location links in the raw main page.
+        
+        Links are matched with a regex over the undecoded body, and only those
+        mentioning a Standesamt are decoded and checked further. The result is
+        only trusted when every such link is a plain text link with an href:
+        as soon as one has markup inside, no href or text that looks like a
+        misread tag, None is returned so the page goes through the full parse
+        in _find_available_locations instead.
+        
+        Args:
+            content: Raw main page body
+            encoding: Character set of the body
+            
+        Returns:
+            List of location dictionaries with names and URLs, or None if the
+            regex cannot account for every Standesamt link
+        """
+        locations = []
+        
+        for match in _ANCHOR_RE.finditer(content):
+            attributes, text = match.groups()
+            if b'standesamt' not in text.lower():
+                continue
+            # Markup, or attribute debris from a tag the regex misread
+            if b'<' in text or b'"' in text or b'=' in text:
+                return None
+            
+            href = _href_attribute(attributes)
+            if href is None:
+                return None
+            
+            location = _location_link(
+                unescape(href.decode(encoding, 'replace')),
+                unescape(text.decode(encoding, 'replace')).strip()
+            )
+            if location:
+                locations.append(location)
+        
+        for location in locations:
+            logger.info(f"Found Standesamt location: {location['name']}")
+        if locations:
+            logger.info(f"Total locations to check: {len(locations)}")
+        
+        return locations
+    
+    def _find_available_locations(self, tree: HtmlElement) -> List[Dict[str, str]]:
         """
         Find available Standesamt locations that can be selected.
         
         Args:
-            soup: BeautifulSoup object of the main page
+            tree: Parsed main page
             
         Returns:
             List of location dictionaries with names and URLs
@@ -89,64 +727,27 @@ class BerlinServiceScraper:
             # Look specifically for appointment booking links for Standesamt locations
             # These often have patterns like "Termin buchen" or "Terminvereinbarung" in the URL
             
-            appointment_links = soup.find_all('a', href=True)
-            
-            for link in appointment_links:
-                href = link.get('href')
-                link_text = link.get_text().strip()
-                
-                # Skip if no meaningful text
-                if not link_text or len(link_text) < 5:
-                    continue
-                
-                # Skip email links and generic navigation
-                if '@' in href or 'mailto:' in href:
-                    continue
-                    
-                # Skip generic navigation links
-                if any(skip in link_text.lower() for skip in ['standorte a-z', 'nach behörden', 'weitere standorte']):
-                    continue
-                
-                # Look for actual Standesamt location names or appointment booking links
-                is_standesamt_location = any([
-                    'standesamt' in link_text.lower() and any(district in link_text.lower() for district in [
-                        'marzahn', 'hellersdorf', 'spandau', 'mitte', 'charlottenburg', 'wilmersdorf',
-                        'tempelhof', 'schöneberg', 'neukölln', 'friedrichshain', 'kreuzberg',
-                        'pankow', 'lichtenberg', 'reinickendorf', 'steglitz', 'zehlendorf', 'treptow'
-                    ]),
-                    ('termin' in href.lower() and 'standesamt' in link_text.lower()),
-                    ('buchung' in href.lower() and 'standesamt' in link_text.lower()),
-                    href.startswith('/terminvereinbarung/') and 'standesamt' in link_text.lower()
-                ])
-                
-                if is_standesamt_location:
-                    full_url = href if href.startswith('http') else f"https://service.berlin.de{href}"
-                    
-                    locations.append({
-                        'name': link_text,
-                        'url': full_url
-                    })
-                    
-                    logger.info(f"Found Standesamt location: {link_text}")
+            for link in tree.iterfind('.//a[@href]'):
+                location = _location_link(link.get('href'), link.text_content().strip())
+                if location:
+                    locations.append(location)
+                    logger.info(f"Found Standesamt location: {location['name']}")
             
             # If no specific location links found, look for form-based location selection
             if not locations:
                 # Look for select elements with Standesamt options
-                select_elements = soup.find_all('select')
-                
-                for select in select_elements:
-                    options = select.find_all('option', value=True)
-                    
-                    for option in options:
-                        option_text = option.get_text().strip()
+                for select in tree.iter('select'):
+                    for option in select.iterfind('.//option[@value]'):
+                        option_text = option.text_content().strip()
                         option_value = option.get('value')
+                        text_lower = option_text.lower()
                         
                         # Skip empty or placeholder options
-                        if not option_value or option_value == '' or 'wählen' in option_text.lower():
+                        if not option_value or 'wählen' in text_lower:
                             continue
                         
                         # Look for Standesamt in option text
-                        if 'standesamt' in option_text.lower():
+                        if 'standesamt' in text_lower:
                             locations.append({
                                 'name': option_text,
                                 'url': None,  # Form-based, will need special handling
@@ -159,9 +760,8 @@ class BerlinServiceScraper:
             # If still no locations, this might be a page that needs direct form interaction
             # Look for specific buttons or form elements that suggest appointment booking
             if not locations:
-                booking_forms = soup.find_all('form')
-                for form in booking_forms:
-                    form_text = form.get_text().lower()
+                for form in tree.iter('form'):
+                    form_text = form.text_content().lower()
                     if 'termin' in form_text and 'standesamt' in form_text:
                         logger.info("Found appointment form that may require direct interaction")
                         # For now, we'll fall back to checking the main page
@@ -178,7 +778,7 @@ class BerlinServiceScraper:
         
         return locations
     
-    def _check_locations_for_appointments(self, locations: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    def _check_locations_for_appointments(self, locations: List[Dict[str, str]]) -> List[Appointment]:
         """
         Check each location for available appointments.
         
@@ -188,158 +788,264 @@ class BerlinServiceScraper:
         Returns:
             List of available appointments across all locations
         """
-        all_appointments = []
+        batch = locations[:5]  # Limit to first 5 locations to avoid too many requests
+        
+        if len(batch) <= 1:
+            # A single location gains nothing from a thread pool
+            results = [self._fetch_and_parse_location(location) for location in batch]
+        else:
+            # Locations are independent, so fetch them all concurrently over the
+            # shared session; the rate limiter still paces the actual requests
+            with ThreadPoolExecutor(max_workers=len(batch)) as executor:
+                results = list(executor.map(self._fetch_and_parse_location, batch))
+        
+        # If no location could be checked at all, the cached links are likely
+        # stale; find them again instead of reporting "no appointments" for a day
+        if results and all(result is None for result in results):
+            logger.warning("Every location check failed, rediscovering locations on the next check")
+            self._forget_locations()
+        
+        return [appointment for result in results if result for appointment in result]
+    
+    def _fetch_and_parse_location(self, location: Dict[str, str]) -> Optional[List[Appointment]]:
+        """
+        Fetch a single location page and parse it for appointments.
         
-        for location in locations[:5]:  # Limit to first 5 locations to avoid too many requests
+        A location page that is gone (404/410) makes the cached locations
+        stale, so they are dropped and rediscovered on the next check.
+        
+        Args:
+            location: Location dictionary
+            
+        Returns:
+            List of available appointments at the location, or None if the
+            location could not be checked
+        """
+        try:
+            location_name = location['name']
+            location_url = location.get('url')
+            
+            if not location_url:
+                logger.info(f"Skipping {location_name} - no direct URL available")
+                return []
+            
+            logger.info(f"Checking appointments for: {location_name}")
+            
+            prepared = self._prepared_requests.get(location_url)
+            if prepared is None:
+                prepared = self.session.prepare_request(requests.Request('GET', location_url))
+                self._prepared_requests[location_url] = prepared
+            
+            # The session's cookies may have changed since the request was
+            # prepared, so rebuild the Cookie header on a copy for every send
+            prepared = prepared.copy()
+            prepared.headers.pop('Cookie', None)
+            prepared.prepare_cookies(self.session.cookies)
+            
+            # Ask only for a changed page when this location was fetched before
+            prepared.headers.update(self._conditional_headers(location_url))
+            
+            # session.send skips what session.request adds from the environment
+            # (proxies, CA bundle, stream and verify settings), so merge it here
+            settings = self.session.merge_environment_settings(prepared.url, {}, True, None, None)
+            
+            self._rate_limiter.acquire()
+            response = self.session.send(prepared, timeout=30, **settings)
+            self._rate_limiter.observe(response)
             try:
-                location_name = location['name']
-                location_url = location.get('url')
-                
-                if not location_url:
-                    logger.info(f"Skipping {location_name} - no direct URL available")
-                    continue
-                
-                logger.info(f"Checking appointments for: {location_name}")
+                if response.status_code == 304:
+                    logger.info(f"{location_name} not modified since last check, reusing result")
+                    return self._location_results.get(location_url, [])
                 
-                # Add delay between requests
-                time.sleep(random.uniform(2, 4))
+                if response.status_code in (404, 410):
+                    logger.warning(f"{location_name} page is gone ({response.status_code}), rediscovering locations on the next check")
+                    self._forget_locations()
+                    return None
                 
-                response = self.session.get(location_url, timeout=30)
                 response.raise_for_status()
+                response.encoding = _page_encoding(response)
+                tree = self._parse_unless_no_appointments(response, location_name)
+            finally:
+                response.close()
+            
+            appointments = self._parse_appointments(tree, location_name) if tree is not None else []
+            
+            self._remember_validators(location_url, response)
+            self._location_results[location_url] = appointments
+            
+            if appointments:
+                logger.info(f"✅ Found {len(appointments)} appointments at {location_name}")
+            else:
+                logger.info(f"❌ No appointments at {location_name}")
+            
+            return appointments
+            
+        except Exception as e:
+            logger.error(f"Error checking {location.get('name', 'unknown')}: {str(e)}")
+            return None
+    
+    def _parse_unless_no_appointments(self, response: requests.Response, location_name: str) -> Optional[HtmlElement]:
+        """
+        Parse a streamed response body as it arrives, stopping early on a "no appointments" phrase.
+        
+        Each chunk is fed to an incremental lxml parser, so parsing overlaps the
+        download and the body is never held in memory next to its tree. The
+        chunk is also lowercased and scanned as bytes (together with the tail
+        of the previous chunk, so phrases spanning two chunks are found). A
+        bytes hit is only a hint, since it may sit in a script, a style or an
+        attribute: reading stops only once the visible text parsed so far
+        contains the phrase.
+        
+        Args:
+            response: Response opened with stream=True, with its encoding set
+            location_name: Name of the location being checked
+            
+        Returns:
+            Root element of the parsed page, or None if a "no appointments"
+            phrase was found
+        """
+        parser = _html_pull_parser(response.encoding)
+        overlap = _NO_APPOINTMENTS_MAX_BYTES - 1
+        tail = b''
+        root = None
+        unconfirmed_hint = False
+        
+        for chunk in response.iter_content(chunk_size=16384):
+            window = tail + chunk
+            tail = window[-overlap:]
+            parser.feed(chunk)
+            
+            if root is None:
+                for _, element in parser.read_events():
+                    root = element.getroottree().getroot()
+            
+            hint = _NO_APPOINTMENTS_BYTES_RE.search(window.lower()) is not None
+            if (hint or unconfirmed_hint) and root is not None:
+                indicator = _find_no_appointments_indicator(root)
+                if indicator:
+                    logger.info(f"Found 'no appointments' indicator at {location_name}: '{indicator}'")
+                    return None
                 
-                soup = BeautifulSoup(response.content, 'html.parser')
-                appointments = self._parse_appointments(soup, location_name)
-                
-                if appointments:
-                    logger.info(f"✅ Found {len(appointments)} appointments at {location_name}")
-                    all_appointments.extend(appointments)
-                else:
-                    logger.info(f"❌ No appointments at {location_name}")
-                    
-            except Exception as e:
-                logger.error(f"Error checking {location.get('name', 'unknown')}: {str(e)}")
-                continue
+                # Text at the very end of a chunk may not be in the tree yet,
+                # so look once more after the next chunk
+                unconfirmed_hint = hint
         
-        return all_appointments
+        tree = parser.close()
+        if tree is None:
+            raise etree.ParserError("Document is empty")
+        return tree
     
-    def _parse_appointments(self, soup: BeautifulSoup, location_name: Optional[str] = None) -> List[Dict[str, str]]:
+    def _parse_appointments(self, tree: HtmlElement, location_name: Optional[str] = None) -> List[Appointment]:
         """
         Parse the HTML content to find available appointments.
         
         Args:
-            soup: BeautifulSoup object of the page content
+            tree: Parsed page content
             location_name: Name of the location being checked (optional)
             
         Returns:
-            List of appointment dictionaries
+            List of found appointments
         """
         appointments = []
         location_info = f" at {location_name}" if location_name else ""
         
         try:
             # Look for explicit "no appointments" messages
-            no_appointments_indicators = [
-                'keine termine', 'no appointments', 'ausgebucht', 'nicht verfügbar',
-                'derzeit keine termine', 'currently no appointments',
-                'alle termine vergeben', 'all appointments taken',
-                'keine verfügbaren termine', 'no available appointments',
-                'keine freien termine', 'no free appointments'
-            ]
-            
-            page_text = soup.get_text().lower()
-            
-            for indicator in no_appointments_indicators:
-                if indicator in page_text:
-                    logger.info(f"Found 'no appointments' indicator{location_info}: '{indicator}'")
-                    return []
-            
-            # Look for ENABLED booking buttons (not disabled)
-            enabled_booking_buttons = soup.find_all(['button', 'a'], 
-                class_=lambda x: x and not any('disabled' in str(c).lower() for c in (x if isinstance(x, list) else [x])),
-                string=lambda text: text and any(
-                    keyword in text.lower() for keyword in ['termin buchen', 'book appointment', 'termin vereinbaren', 'buchen']
-                )
-            )
+            indicator = _find_no_appointments_indicator(tree)
+            if indicator:
+                logger.info(f"Found 'no appointments' indicator{location_info}: '{indicator}'")
+                return []
             
-            # Look for calendar/date picker elements
-            calendar_elements = soup.find_all(['input'], attrs={
-                'type': ['date', 'datetime-local'],
-                'class': lambda x: x and 'calendar' in str(x).lower()
-            })
-            
-            # Look for time slot buttons/links that are clickable and enabled
-            time_slot_elements = soup.find_all(['button', 'a'], 
-                class_=lambda x: x and not any('disabled' in str(c).lower() for c in (x if isinstance(x, list) else [x])),
-                string=lambda text: text and text.strip() and (
-                    # Time patterns like "09:00", "14:30"
-                    ':' in text and len(text.strip()) <= 10 and 
-                    any(char.isdigit() for char in text)
-                )
-            )
+            enabled_booking_buttons = 0
+            time_slot_elements = 0
+            disabled_booking_buttons = 0
+            calendar_elements = 0
+            date_selects = 0
+            
+            # Classify every relevant element in a single pass over the tree
+            for element in tree.iter('button', 'a', 'input', 'select'):
+                tag = element.tag
+                
+                if tag == 'input':
+                    # Look for calendar/date picker elements
+                    if _is_calendar_input(element):
+                        calendar_elements += 1
+                    continue
+                
+                if tag == 'select':
+                    # Look for date/time selection forms
+                    if _is_date_select(element):
+                        date_selects += 1
+                    continue
+                
+                classes = element.get('class')
+                if not classes:
+                    continue
+                
+                text = element.text_content().strip()
+                if not text:
+                    continue
+                
+                text_lower = text.lower()
+                
+                if 'disabled' in classes.lower():
+                    # Disabled buttons indicate the location selection step
+                    if tag == 'button' and 'termin' in text_lower:
+                        disabled_booking_buttons += 1
+                    continue
+                
+                # Look for ENABLED booking buttons (not disabled)
+                if _BOOKING_RE.search(text):
+                    enabled_booking_buttons += 1
+                
+                # Look for time slot buttons/links, e.g. "09:00", "14:30"
+                if _TIME_SLOT_RE.match(text):
+                    time_slot_elements += 1
+            
+            # A disabled booking button on the main page means a location has
+            # to be picked first, whatever else the page shows
+            if disabled_booking_buttons and not location_name:
+                logger.info("Found disabled booking button on main page - location selection required")
+                return []
             
             # Look for explicit availability confirmation text
-            positive_availability = soup.find_all(string=lambda text: text and any(
-                phrase in text.lower() for phrase in [
-                    'termine verfügbar', 'appointments available',
-                    'freie termine', 'free appointments',
-                    'buchbare termine', 'bookable appointments',
-                    'termin wählen', 'choose appointment',
-                    'verfügbare zeiten', 'available times'
-                ]
-            ))
-            
-            # Look for date/time selection forms
-            date_selects = soup.find_all(['select'], attrs={
-                'name': lambda x: x and any(keyword in x.lower() for keyword in ['date', 'time', 'termin'])
-            })
+            positive_availability = int(_COUNT_POSITIVE_AVAILABILITY_TEXTS(tree))
             
             # Count meaningful indicators
             meaningful_indicators = (
-                len(enabled_booking_buttons) + 
-                len(calendar_elements) + 
-                len(time_slot_elements) + 
-                len(positive_availability) +
-                len(date_selects)
-            )
-            
-            logger.info(f"Appointment check{location_info}:")
-            logger.info(f"  - {len(enabled_booking_buttons)} enabled booking buttons")
-            logger.info(f"  - {len(calendar_elements)} calendar elements")
-            logger.info(f"  - {len(time_slot_elements)} time slot elements")
-            logger.info(f"  - {len(positive_availability)} positive availability texts")
-            logger.info(f"  - {len(date_selects)} date/time selects")
-            logger.info(f"  - Total meaningful indicators: {meaningful_indicators}")
-            
-            # Check for disabled buttons that would indicate the location selection step
-            disabled_booking_buttons = soup.find_all(['button'], 
-                class_=lambda x: x and any('disabled' in str(c).lower() for c in (x if isinstance(x, list) else [x])),
-                string=lambda text: text and 'termin' in text.lower()
+                enabled_booking_buttons + 
+                calendar_elements + 
+                time_slot_elements + 
+                positive_availability +
+                date_selects
             )
             
-            if disabled_booking_buttons and not location_name:
-                logger.info("Found disabled booking button on main page - location selection required")
-                return []
+            # Skip formatting the breakdown entirely when INFO is filtered out
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Appointment check{location_info}:")
+                logger.info(f"  - {enabled_booking_buttons} enabled booking buttons")
+                logger.info(f"  - {calendar_elements} calendar elements")
+                logger.info(f"  - {time_slot_elements} time slot elements")
+                logger.info(f"  - {positive_availability} positive availability texts")
+                logger.info(f"  - {date_selects} date/time selects")
+                logger.info(f"  - Total meaningful indicators: {meaningful_indicators}")
             
             # Report appointments if we have good evidence
             if meaningful_indicators >= 1:  # Lower threshold since we're checking specific locations
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                current_time = _now_str()
                 
-                appointment_data = {
-                    'type': 'Berlin Service Appointment',
-                    'url': self.base_url,
-                    'found_at': current_time,
-                    'details': f"Appointment availability detected{location_info} (indicators: {meaningful_indicators})",
-                    'enabled_buttons': len(enabled_booking_buttons),
-                    'calendar_elements': len(calendar_elements),
-                    'time_slots': len(time_slot_elements),
-                    'availability_texts': len(positive_availability),
-                    'date_selects': len(date_selects)
-                }
-                
-                if location_name:
-                    appointment_data['location'] = location_name
-                
-                appointments.append(appointment_data)
+                appointments.append(Appointment(
+                    type='Berlin Service Appointment',
+                    url=self.base_url,
+                    found_at=current_time,
+                    details=f"Appointment availability detected{location_info} (indicators: {meaningful_indicators})",
+                    enabled_buttons=enabled_booking_buttons,
+                    calendar_elements=calendar_elements,
+                    time_slots=time_slot_elements,
+                    availability_texts=positive_availability,
+                    date_selects=date_selects,
+                    location=location_name
+                ))
                 
                 logger.info(f"✅ Confirmed appointment availability{location_info}!")
             else:
@@ -350,12 +1056,12 @@ class BerlinServiceScraper:
         
         return appointments
     
-    def format_appointment_message(self, appointments: List[Dict[str, str]]) -> str:
+    def format_appointment_message(self, appointments: List[Appointment]) -> str:
         """
         Format appointment information into a notification message.
         
         Args:
-            appointments: List of appointment dictionaries
+            appointments: List of found appointments
             
         Returns:
             Formatted message string
@@ -369,54 +1075,17 @@ class BerlinServiceScraper:
             f"Found {len(appointments)} available appointment(s):",
             ""
         ]
-        
-        for i, apt in enumerate(appointments, 1):
-            message_lines.extend([
-                f"📍 Appointment {i}:",
-                f"  Type: {apt.get('type', 'Unknown')}",
-                f"  Location: {apt.get('location', 'Main page')}"
-            ])
-            
-            if apt.get('location'):
-                message_lines.append(f"  🏢 Standesamt: {apt.get('location')}")
-            
-            message_lines.extend([
-                f"  🔗 URL: {apt.get('url', 'N/A')}",
-                f"  ⏰ Found at: {apt.get('found_at', 'N/A')}",
-                f"  📊 Indicators: {apt.get('details', 'N/A')}",
-                ""
-            ])
-            
-            # Add technical details
-            if apt.get('enabled_buttons', 0) > 0:
-                message_lines.append(f"  ✅ {apt.get('enabled_buttons')} enabled booking buttons")
-            if apt.get('time_slots', 0) > 0:
-                message_lines.append(f"  🕐 {apt.get('time_slots')} time slots available")
-            if apt.get('calendar_elements', 0) > 0:
-                message_lines.append(f"  📅 {apt.get('calendar_elements')} calendar elements")
-            if apt.get('date_selects', 0) > 0:
-                message_lines.append(f"  📝 {apt.get('date_selects')} date selection forms")
-            
-            message_lines.append("")
-        
-        message_lines.extend([
-            "🚀 **Action Required:**",
-            "1. Click the link above",
-            "2. Select your preferred Standesamt location",
-            "3. Choose an available appointment slot",
-            "4. Complete the booking process",
-            "",
-            "📍 **Available Locations May Include:**",
-            "- Standesamt Marzahn-Hellersdorf",
-            "- Standesamt Spandau", 
-            "- Other Berlin Standesamt offices",
-            "",
-            f"🔍 **Monitoring Details:**",
-            f"- Service: Namensrechtliche Erklärung", 
-            f"- Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        message_lines += [
+            line
+            for i, apt in enumerate(appointments, 1)
+            for line in _appointment_lines(i, apt)
+        ]
+        message_lines += MESSAGE_FOOTER_LINES
+        message_lines += [
+            f"- Checked at: {_now_str()}",
             f"- Direct link: {self.base_url}",
             "",
             "⚡ **Note:** Book quickly as appointments fill up fast!"
-        ])
+        ]
         
         return "\n".join(message_lines)
\ No newline at end of file
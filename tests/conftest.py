@@ -0,0 +1,26 @@
+"""Shared pytest fixtures."""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scraper import BerlinServiceScraper  # noqa: E402
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Scraper settings with the locations file in a temporary directory."""
+    return SimpleNamespace(
+        locations_file=str(tmp_path / 'locations.json'),
+        locations_ttl=86400
+    )
+
+
+@pytest.fixture
+def scraper(config):
+    """A scraper using the shared session."""
+    return BerlinServiceScraper(config)
@@ -0,0 +1,103 @@
+"""Tests for the GitHub issue channel in notifier.py."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from notifier import NotificationManager
+
+ISSUES_URL = 'https://api.github.com/repos/owner/repo/issues'
+
+
+def make_response(status_code: int, payload=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    return response
+
+
+class StubSession:
+    """Session answering each (method, url) with a queued response or error."""
+    
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+    
+    def _answer(self, method, url):
+        self.calls.append((method, url))
+        response = self.responses[(method, url)]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    
+    def get(self, url, **kwargs):
+        return self._answer('GET', url)
+    
+    def post(self, url, **kwargs):
+        return self._answer('POST', url)
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def github_notifier():
+    config = SimpleNamespace(
+        github_token='token',
+        github_repo='owner/repo',
+        pushover_token=None,
+        pushover_user=None,
+        pushbullet_token=None,
+        ntfy_topic=None,
+        webhook_url=None,
+        notification_email=None,
+        email_password=None,
+        has_github_config=True,
+        has_email_config=False,
+        has_pushover_config=False,
+        has_pushbullet_config=False,
+        has_ntfy_config=False,
+        has_webhook_config=False
+    )
+    return NotificationManager(config)
+
+
+def test_alert_is_added_to_the_open_issue(github_notifier):
+    github_notifier._session = StubSession({
+        ('GET', ISSUES_URL): make_response(200, [{'number': 7}]),
+        ('POST', f'{ISSUES_URL}/7/comments'): make_response(201, {'html_url': 'c'}),
+    })
+    
+    assert github_notifier._send_github_issue('Title', 'Body', 'now')
+    assert github_notifier._session.calls[-1] == ('POST', f'{ISSUES_URL}/7/comments')
+    assert github_notifier._open_issue_number == 7
+
+
+@pytest.mark.parametrize('comment_status', [403, 404])
+def test_issue_is_created_when_the_open_issue_takes_no_comments(github_notifier, comment_status):
+    github_notifier._session = StubSession({
+        ('GET', ISSUES_URL): make_response(200, [{'number': 7}]),
+        ('POST', f'{ISSUES_URL}/7/comments'): make_response(comment_status),
+        ('POST', ISSUES_URL): make_response(201, {'number': 8, 'html_url': 'i'}),
+    })
+    
+    assert github_notifier._send_github_issue('Title', 'Body', 'now')
+    assert github_notifier._session.calls[-1] == ('POST', ISSUES_URL)
+    assert github_notifier._open_issue_number == 8
+
+
+@pytest.mark.parametrize('lookup', [
+    make_response(503),
+    requests.exceptions.ConnectionError('unreachable'),
+])
+def test_issue_is_created_when_the_lookup_fails(github_notifier, lookup):
+    github_notifier._session = StubSession({
+        ('GET', ISSUES_URL): lookup,
+        ('POST', ISSUES_URL): make_response(201, {'number': 8, 'html_url': 'i'}),
+    })
+    
+    assert github_notifier._send_github_issue('Title', 'Body', 'now')
+    assert github_notifier._session.calls == [('GET', ISSUES_URL), ('POST', ISSUES_URL)]
+    assert github_notifier._open_issue_number == 8
@@ -0,0 +1,212 @@
+"""Tests for the appointment detection in scraper.py."""
+
+import os
+import time
+
+import pytest
+import requests
+
+from scraper import BerlinServiceScraper, _parse_html
+
+
+class StatusSession(requests.Session):
+    """Session answering every request with an empty response of one status."""
+    
+    def __init__(self, status_code: int):
+        super().__init__()
+        self.status_code = status_code
+        self.sent = []
+    
+    def send(self, request, **kwargs):
+        self.sent.append((request, kwargs))
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.url = request.url
+        response._content = b''
+        return response
+
+
+class RedirectSession(requests.Session):
+    """Session answering GETs with a page reached through a redirect."""
+    
+    def __init__(self, url: str, body: bytes):
+        super().__init__()
+        self.url = url
+        self.body = body
+    
+    def get(self, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = self.url
+        response.history = [requests.Response()]
+        response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        response._content = self.body
+        return response
+
+
+class StreamedResponse:
+    """Minimal stand-in for a streamed requests.Response."""
+    
+    def __init__(self, body: bytes, chunk_size: int = 64):
+        self.encoding = 'utf-8'
+        self.chunks_read = 0
+        self._chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    
+    def iter_content(self, chunk_size=1):
+        for chunk in self._chunks:
+            self.chunks_read += 1
+            yield chunk
+
+
+def test_no_appointments_phrase_split_by_markup(scraper):
+    page = '<html><body><p>Derzeit sind <b>keine</b> Termine verfügbar.</p></body></html>'
+    tree = _parse_html(page.encode('utf-8'))
+    
+    assert scraper._parse_appointments(tree, 'Standesamt Mitte') == []
+
+
+def test_script_and_style_text_is_ignored(scraper):
+    page = (
+        "<html><head><style>.empty:after { content: 'Freie Termine'; }</style></head><body>"
+        "<script>var i18n = {empty: 'Keine Termine'};</script>"
+        "<p>Freie Termine</p>"
+        "<a class='slot' href='/t/1'>09:00</a>"
+        "</body></html>"
+    )
+    appointments = scraper._parse_appointments(_parse_html(page.encode('utf-8')), 'Standesamt Mitte')
+    
+    assert len(appointments) == 1
+    assert appointments[0].time_slots == 1
+    assert appointments[0].availability_texts == 1
+
+
+def test_stream_ignores_negative_phrase_in_script(scraper):
+    page = (
+        "<html><head><script>var i18n = {empty: 'Keine Termine'};</script></head><body>"
+        "<p>Freie Termine</p><a class='slot' href='/t/1'>09:00</a>"
+        + "<p>Weitere Informationen</p>" * 20
+        + "</body></html>"
+    )
+    tree = scraper._parse_unless_no_appointments(StreamedResponse(page.encode('utf-8')), 'Standesamt Mitte')
+    
+    assert tree is not None
+    assert len(scraper._parse_appointments(tree, 'Standesamt Mitte')) == 1
+
+
+def test_stream_stops_early_on_visible_negative_phrase(scraper):
+    page = (
+        "<html><body><p>Derzeit sind keine Termine verfügbar.</p>"
+        + "<p>Weitere Informationen</p>" * 50
+        + "</body></html>"
+    )
+    response = StreamedResponse(page.encode('utf-8'))
+    
+    assert scraper._parse_unless_no_appointments(response, 'Standesamt Mitte') is None
+    assert response.chunks_read < len(response._chunks)
+
+
+def test_location_links_with_nested_markup_are_not_dropped(scraper):
+    page = (
+        '<html><body>'
+        '<a href="/standort/1/">Standesamt Mitte</a>'
+        '<a href="/standort/2/">Standesamt Spandau</a>'
+        '<a href="/standort/3/"><span>Standesamt Pankow</span></a>'
+        '</body></html>'
+    ).encode('utf-8')
+    
+    assert scraper._find_location_links(page, 'utf-8') is None
+    names = [location['name'] for location in scraper._find_available_locations(_parse_html(page))]
+    assert names == ['Standesamt Mitte', 'Standesamt Spandau', 'Standesamt Pankow']
+
+
+def test_plain_location_links_skip_the_parse(scraper):
+    page = (
+        '<html><body>'
+        '<a class="x" href="/terminvereinbarung/?a=1&amp;b=2">Standesamt Neukölln</a>'
+        '<a href="/standort/1/">Standorte A-Z</a>'
+        '</body></html>'
+    ).encode('utf-8')
+    
+    assert scraper._find_location_links(page, 'utf-8') == [{
+        'name': 'Standesamt Neukölln',
+        'url': 'https://service.berlin.de/terminvereinbarung/?a=1&b=2'
+    }]
+
+
+@pytest.mark.parametrize('status_code', [404, 410, 500])
+def test_failed_location_pages_drop_the_saved_locations(config, status_code):
+    scraper = BerlinServiceScraper(config, session=StatusSession(status_code))
+    locations = [{'name': 'Standesamt Mitte', 'url': 'https://service.berlin.de/standort/1/'}]
+    scraper._save_locations_file(locations)
+    scraper._locations_cache = (time.monotonic(), locations)
+    
+    assert scraper._check_locations_for_appointments(locations) == []
+    assert scraper._locations_cache is None
+    assert not os.path.exists(config.locations_file)
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://service.berlin.de/dienstleistung/324591/?moved=1', 1),
+    ('https://www.berlin.de/wartung/', 0),
+])
+def test_only_off_host_redirects_are_stubs(config, url, expected):
+    page = (
+        '<html><body><p>Freie Termine</p>'
+        '<a class="slot" href="/t/1">09:00</a>'
+        f'<!-- {"x" * 2048} --></body></html>'
+    ).encode('utf-8')
+    scraper = BerlinServiceScraper(config, session=RedirectSession(url, page))
+    
+    assert len(scraper.check_appointments()) == expected
+
+
+def test_location_requests_carry_current_cookies(config, monkeypatch):
+    monkeypatch.setenv('HTTPS_PROXY', 'http://proxy.example:3128')
+    session = StatusSession(500)
+    scraper = BerlinServiceScraper(config, session=session)
+    location = {'name': 'Standesamt Mitte', 'url': 'https://service.berlin.de/standort/1/'}
+    
+    scraper._fetch_and_parse_location(location)
+    session.cookies.set('session', 'fresh', domain='service.berlin.de')
+    scraper._fetch_and_parse_location(location)
+    
+    (first, _), (second, kwargs) = session.sent
+    assert 'Cookie' not in first.headers
+    assert second.headers['Cookie'] == 'session=fresh'
+    assert kwargs['stream'] is True
+    assert kwargs['proxies']['https'] == 'http://proxy.example:3128'
+
+
+@pytest.mark.parametrize('spandau, fast_path', [
+    ('<a title="a > b" href="/standort/2/">Standesamt Spandau</a>', True),
+    ('<a href="/standort/2/" title="a > b">Standesamt Spandau</a>', True),
+    ('<a data-href="/other/" href="/standort/2/">Standesamt Spandau</a>', True),
+    ("<a title='href=/other/' href=/standort/2/>Standesamt Spandau</a>", True),
+    ('<a name="spandau">Standesamt Spandau</a>', False),
+])
+def test_location_links_agree_with_the_parsed_page(scraper, spandau, fast_path):
+    page = (
+        '<html><body>'
+        f'<a href="/standort/1/">Standesamt Mitte</a>{spandau}'
+        '</body></html>'
+    ).encode('utf-8')
+    
+    links = scraper._find_location_links(page, 'utf-8')
+    
+    if fast_path:
+        assert links == scraper._find_available_locations(_parse_html(page))
+        assert [link['url'] for link in links] == [
+            'https://service.berlin.de/standort/1/',
+            'https://service.berlin.de/standort/2/',
+        ]
+    else:
+        assert links is None
+
+
+def test_rate_limited_location_pages_slow_down_later_requests(config):
+    scraper = BerlinServiceScraper(config, session=StatusSession(429))
+    rate = scraper._rate_limiter.rate
+    location = {'name': 'Standesamt Mitte', 'url': 'https://service.berlin.de/standort/1/'}
+    
+    assert scraper._fetch_and_parse_location(location) is None
+    assert scraper._rate_limiter.rate == rate / 2